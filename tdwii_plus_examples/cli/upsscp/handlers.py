@@ -1,7 +1,10 @@
 """Event handlers for upsscp.py"""
 import copy
+import functools
 import logging
 import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 
 # from io import BytesIO
 from pathlib import Path
@@ -31,10 +34,10 @@ from sqlalchemy.orm import sessionmaker
 
 from tdwii_plus_examples import tdwii_config
 from tdwii_plus_examples.cli.upsscp.upsdb import (
-    Instance,
     InvalidIdentifier,
     add_instance,
     search,
+    search_iter,
 )
 
 _SERVICE_STATUS = {
@@ -63,7 +66,85 @@ _SERVICE_STATUS = {
         "COMPLETED": 0xB306,
     },
 }
-_ups_instances = dict()
+
+
+class _UpsStore:
+    """Structure-of-arrays store for the loaded UPS instances
+
+    The scalar match keys are extracted once when an instance is added and
+    kept in parallel columns, mirroring the rows of the SQLite match index
+    so both stay in step through add/replace/remove.
+    """
+
+    __slots__ = ("uids", "states", "machines", "datasets", "by_uid")
+
+    def __init__(self):
+        self.uids = []
+        self.states = []
+        self.machines = []
+        self.datasets = []
+        self.by_uid = dict()
+
+    def __len__(self):
+        return len(self.uids)
+
+    def __contains__(self, sop_instance_uid):
+        return sop_instance_uid in self.by_uid
+
+    def __getitem__(self, sop_instance_uid):
+        return self.datasets[self.by_uid[sop_instance_uid]]
+
+    def values(self):
+        return list(self.datasets)
+
+    def match_keys(self, sop_instance_uid):
+        index = self.by_uid[sop_instance_uid]
+        return self.states[index], self.machines[index]
+
+    def add(self, sop_instance_uid, ds, step_state, machine_name) -> bool:
+        # setdefault keeps the duplicate check and the insert down to a
+        # single hash probe
+        index = len(self.uids)
+        if self.by_uid.setdefault(sop_instance_uid, index) != index:
+            return False
+        self.uids.append(sop_instance_uid)
+        self.states.append(step_state)
+        self.machines.append(machine_name)
+        self.datasets.append(ds)
+        return True
+
+    def replace(self, sop_instance_uid, ds, step_state, machine_name) -> bool:
+        """Refresh the stored dataset and match keys for a known UID in place"""
+        index = self.by_uid.get(sop_instance_uid)
+        if index is None:
+            return False
+        self.states[index] = step_state
+        self.machines[index] = machine_name
+        self.datasets[index] = ds
+        return True
+
+    def remove(self, sop_instance_uid) -> bool:
+        index = self.by_uid.pop(sop_instance_uid, None)
+        if index is None:
+            return False
+        last_index = len(self.uids) - 1
+        if index != last_index:
+            # keep removal O(1) by swapping the last entry into the hole
+            for column in (self.uids, self.states, self.machines, self.datasets):
+                column[index] = column[last_index]
+            self.by_uid[self.uids[index]] = index
+        for column in (self.uids, self.states, self.machines, self.datasets):
+            column.pop()
+        return True
+
+
+_ups_instances = _UpsStore()
+# In-memory SQLite index over the loaded UPS instances so that C-FIND
+# matching is an indexed lookup instead of a linear scan over datasets
+_ups_index = None
+# mtime (in ns) of each UPS file at the time it was last loaded, so a
+# reload does not re-read unchanged files
+_ups_file_mtime_cache = dict()
 
 _global_subscribers = dict()  # AE Title and delete lock boolean "TRUE" or "FALSE" is the text representation
 _filtered_subscribers = dict()  # AE Title and the Dataset acting as the query filter
@@ -122,34 +203,185 @@ def _remove_filtered_subscriber(subscriber_ae_title: str, query: Dataset = None,
     return
 
 
+# sessionmaker per database path; engine construction (URL parsing,
+# connection pool setup) is too expensive to repeat on every request
+_session_makers = dict()
+
+
+def _get_session(db_path):
+    """Return a new Session for `db_path`, reusing a cached Engine and sessionmaker"""
+    make_session = _session_makers.get(db_path)
+    if make_session is None:
+        engine = create_engine(db_path)
+        make_session = sessionmaker(bind=engine, expire_on_commit=False)
+        _session_makers[db_path] = make_session
+    return make_session()
+
+
+def _search_matches(model, query_ds, db_path, logger, op_name, db_error_code):
+    """Run a materializing UPS search with the shared session and error handling.
+
+    One implementation of the open-session/search/map-errors/close block
+    that the DIMSE handlers otherwise each carry a copy of.
+
+    Parameters
+    ----------
+    model : pydicom.uid.UID
+        The information model to search with.
+    query_ds : pydicom.dataset.Dataset
+        The query dataset.
+    db_path : str
+        The database path to use with create_engine().
+    logger : logging.Logger
+        The application's logger.
+    op_name : str
+        The DIMSE operation name to use in error messages, e.g. ``"N-SET"``.
+    db_error_code : int
+        The status to report when the database query fails.
+
+    Returns
+    -------
+    list of Instance or None, int
+        The matches and ``0x0000`` on success, or ``None`` and the error
+        status the handler should yield.
+    """
+    session = _get_session(db_path)
+    try:
+        return search(model, query_ds, session), 0x0000
+    except InvalidIdentifier as exc:
+        session.rollback()
+        logger.error(f"Invalid {op_name} Identifier received")
+        logger.error(str(exc))
+        return None, 0xA900
+    except Exception as exc:
+        session.rollback()
+        logger.error("Exception occurred while querying database")
+        logger.exception(exc)
+        return None, db_error_code
+    finally:
+        session.close()
+
+
+@functools.lru_cache(maxsize=256)
+def _cached_dcmread(path: str) -> Dataset:
+    return dcmread(path, force=True)
+
+
+def _load_ds(path) -> Dataset:
+    """Read a stored SOP Instance, reusing a previously parsed Dataset if available
+
+    Repeated retrieves of the same instance then skip the disk read and the
+    full pydicom parse.  Callers receive a deep copy, never the cached
+    instance itself: the handlers mutate what they load (and run on
+    separate association threads), so handing out the cached object would
+    let one request's edits leak into later reads.  Call
+    _invalidate_ds_cache after (re)writing an instance file so stale
+    parses are not served.
+    """
+    return copy.deepcopy(_cached_dcmread(str(path)))
+
+
+def _invalidate_ds_cache():
+    # lru_cache has no per-key eviction; writes are rare compared to reads
+    # so dropping the whole cache is good enough
+    _cached_dcmread.cache_clear()
+
+
+def _get_ups_index() -> sqlite3.Connection:
+    """Return the in-memory SQLite index of UPS match keys, creating it on first use"""
+    global _ups_index
+    if _ups_index is None:
+        _ups_index = sqlite3.connect(":memory:", check_same_thread=False)
+        _ups_index.execute(
+            "CREATE TABLE ups (sop_instance_uid TEXT PRIMARY KEY, step_state TEXT, machine_name TEXT)"
+        )
+        _ups_index.execute("CREATE INDEX idx_state ON ups(step_state)")
+        _ups_index.execute("CREATE INDEX idx_machine ON ups(machine_name)")
+    return _ups_index
+
+
+def _match_keys_for_ups(ds: Dataset):
+    """Extract the (step state, machine name) match keys from a UPS or query Dataset
+
+    Missing or empty attributes are returned as None so they can act as
+    NULL (i.e. unconstrained) predicates in the SQLite index.
+    """
+    step_state = get_procedure_step_state_from_ups(ds)
+    machine_name = get_machine_name_from_ups(ds)
+    if step_state is not None and len(step_state) == 0:
+        step_state = None
+    if machine_name is not None and len(machine_name) == 0:
+        machine_name = None
+    return step_state, machine_name
+
+
+class CompiledQuery:
+    """The match predicates of a UPS C-FIND query, extracted once per request
+
+    Compiling the query Dataset up front means the sequence and attribute
+    traversals are not repeated for every candidate UPS.
+    TODO: add DateTime range and ScheduledWorkitemCodeSequence predicates
+    """
+
+    __slots__ = ("step_state", "machine_name")
+
+    def __init__(self, step_state=None, machine_name=None):
+        self.step_state = step_state
+        self.machine_name = machine_name
+
+    def is_empty(self) -> bool:
+        return self.step_state is None and self.machine_name is None
+
+
+def _compile_query(query_as_ds: Dataset) -> CompiledQuery:
+    step_state, machine_name = _match_keys_for_ups(query_as_ds)
+    return CompiledQuery(step_state=step_state, machine_name=machine_name)
+
+
 def _add_ups_instance(ds: Dataset):
-    sopInstanceUID = str(ds.SOPInstanceUID)
-    if sopInstanceUID not in _ups_instances.keys():
-        _ups_instances[sopInstanceUID] = ds
+    sop_instance_uid = str(ds.SOPInstanceUID)
+    step_state, machine_name = _match_keys_for_ups(ds)
+    if not _ups_instances.add(sop_instance_uid, ds, step_state, machine_name):
+        # a reloaded file can carry changed content for a known UID
+        # (e.g. a state change written by another actor); refresh the
+        # stored dataset and match keys instead of discarding the parse
+        _ups_instances.replace(sop_instance_uid, ds, step_state, machine_name)
+    index = _get_ups_index()
+    index.execute(
+        "INSERT OR REPLACE INTO ups (sop_instance_uid, step_state, machine_name) VALUES (?, ?, ?)",
+        (sop_instance_uid, step_state, machine_name),
+    )
+    index.commit()
 
 
 def _remove_ups_instance(ds: Dataset):
-    sopInstanceUID = str(ds.SOPInstanceUID)
-    if sopInstanceUID in _ups_instances.keys():
-        del _ups_instances[sopInstanceUID]
+    sop_instance_uid = str(ds.SOPInstanceUID)
+    if _ups_instances.remove(sop_instance_uid):
+        index = _get_ups_index()
+        index.execute("DELETE FROM ups WHERE sop_instance_uid = ?", (sop_instance_uid,))
+        index.commit()
 
 
-def _ups_is_match_for_query(query: Dataset, ups: Dataset) -> bool:
-    """Determine if a given UPS is a match for the query
-    This would be much better done by having rows in a database and using a SQL query
-    instead of iterating through each UPS
-    But this is a reasonable approach for a simple test bed
+def _ups_is_match_for_query(query: CompiledQuery, ups: Dataset) -> bool:
+    """Determine if a given UPS is a match for the compiled query
+    This is the reference predicate that the in-memory SQLite index
+    (see _get_ups_index) implements for the hot search path
 
     Args:
-        query (Dataset): The UPS C-FIND-RQ
+        query (CompiledQuery): The compiled UPS C-FIND-RQ predicates
         ups (Dataset): The actual UPS (SCHEDULED or otherwise )
 
     Returns:
         bool: whether the UPS matched the query
     """
-    if not machine_name_matches(query, ups):
+    sop_instance_uid = str(ups.SOPInstanceUID)
+    if sop_instance_uid in _ups_instances:
+        ups_step_state, ups_machine_name = _ups_instances.match_keys(sop_instance_uid)
+    else:
+        ups_step_state, ups_machine_name = _match_keys_for_ups(ups)
+    if not machine_name_matches(query.machine_name, ups_machine_name):
         return False
-    if not procedure_step_state_matches(query, ups):
+    if not procedure_step_state_matches(query.step_state, ups_step_state):
         return False
     # TODO: add more checks.
     # DateTime Range is common.
@@ -167,51 +399,49 @@ def _ups_is_match_for_query(query: Dataset, ups: Dataset) -> bool:
     return True
 
 
-def procedure_step_state_matches(query, ups):
-    is_match = True  # until it's false?
-    requested_step_status = get_procedure_step_state_from_ups(query)
-    ups_step_status = get_procedure_step_state_from_ups(ups)
-    if requested_step_status is not None and len(requested_step_status) > 0:
-        if requested_step_status != ups_step_status:
-            is_match = False
-    return is_match
+def procedure_step_state_matches(requested_step_status, ups_step_status):
+    return requested_step_status is None or requested_step_status == ups_step_status
 
 
-def machine_name_matches(query, ups):
-    requested_machine_name = get_machine_name_from_ups(query)
-    scheduled_machine_name = get_machine_name_from_ups(ups)
-    if requested_machine_name is not None and len(requested_machine_name) > 0:
-        if scheduled_machine_name != requested_machine_name:
-            return False
-    return True
+def machine_name_matches(requested_machine_name, scheduled_machine_name):
+    return requested_machine_name is None or requested_machine_name == scheduled_machine_name
 
 
 def get_machine_name_from_ups(query):
-    seq = query.ScheduledStationNameCodeSequence
-    if seq is not None:
-        for item_index in range(len(seq)):
-            machine_name = seq[item_index].CodeValue
-    return machine_name
+    seq = getattr(query, "ScheduledStationNameCodeSequence", None)
+    if not seq:
+        return None
+    return seq[0].CodeValue
 
 
 def get_procedure_step_state_from_ups(query):
-    step_status = query.ProcedureStepState
-    return step_status
+    return getattr(query, "ProcedureStepState", None)
+
+
+_UPS_MATCH_PREDICATE = "(:state IS NULL OR step_state = :state) AND (:machine IS NULL OR machine_name = :machine)"
 
 
 def _search_ups(query_as_ds: Dataset):
-    # TODO:  actually try to match instead of sending everything back as a match
-    for ups in _ups_instances.values():
-        if _ups_is_match_for_query(query_as_ds, ups):
-            yield ups
+    compiled_query = _compile_query(query_as_ds)
+    cursor = _get_ups_index().execute(
+        f"SELECT sop_instance_uid FROM ups WHERE {_UPS_MATCH_PREDICATE}",
+        {"state": compiled_query.step_state, "machine": compiled_query.machine_name},
+    )
+    for row in cursor:
+        yield _ups_instances[row[0]]
 
 
 def _number_of_matching_ups(query_as_ds: Dataset):
-    number_of_matches = 0
-    for ups in _ups_instances.values():
-        if _ups_is_match_for_query(query_as_ds, ups):
-            number_of_matches += 1
-    return number_of_matches
+    compiled_query = _compile_query(query_as_ds)
+    if compiled_query.is_empty():
+        # clients commonly probe availability with no predicates;
+        # everything matches, so don't bother the index
+        return len(_ups_instances)
+    cursor = _get_ups_index().execute(
+        f"SELECT COUNT(*) FROM ups WHERE {_UPS_MATCH_PREDICATE}",
+        {"state": compiled_query.step_state, "machine": compiled_query.machine_name},
+    )
+    return cursor.fetchone()[0]
 
 
 def handle_find(event, instance_dir, db_path, cli_config, logger):
@@ -234,10 +464,12 @@ def handle_find(event, instance_dir, db_path, cli_config, logger):
         The C-FIND response's *Status* and if the *Status* is pending then
         the dataset to be sent, otherwise ``None``.
     """
-    requestor = event.assoc.requestor
-    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-    addr, port = requestor.address, requestor.port
-    logger.info(f"Received C-FIND request from {addr}:{port} at {timestamp}")
+    # skip the strftime/attribute-chain work entirely when INFO is
+    # filtered out; %-style args let the logging module defer formatting
+    if logger.isEnabledFor(logging.INFO):
+        requestor = event.assoc.requestor
+        timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("Received C-FIND request from %s:%s at %s", requestor.address, requestor.port, timestamp)
 
     model = event.request.AffectedSOPClassUID
 
@@ -252,14 +484,52 @@ def handle_find(event, instance_dir, db_path, cli_config, logger):
         #         yield 0xFF00, response
         #     yield 0x0000, None
         # else:
-        engine = create_engine(db_path)
-        with engine.connect() as conn:  # noqa:  F841
-            Session = sessionmaker(bind=engine)
-            session = Session()
-            # Search database using Identifier as the query
+        # Search database using Identifier as the query; the session must
+        # stay open while the streaming cursor is iterated, so it is closed
+        # after the yield loop rather than as soon as the query is built
+        session = _get_session(db_path)
+        try:
             try:
-                matches = search(model, event.identifier, session)
-
+                matches = search_iter(model, event.identifier, session)
+
+                # hoisted out of the yield loop; invariant per request
+                instance_path = Path(instance_dir)
+
+                # Yield results as the cursor streams them in small batches.
+                # The next instance is read and parsed on a worker thread
+                # while pynetdicom encodes and sends the current response,
+                # overlapping file I/O with the network send.
+                with ThreadPoolExecutor(max_workers=2) as prefetcher:
+                    match_iter = iter(matches)
+                    match = next(match_iter, None)
+                    pending = None
+                    if match is not None:
+                        pending = prefetcher.submit(_load_ds, instance_path.joinpath(str(match.sop_instance_uid)))
+                    while match is not None:
+                        loading = pending
+                        next_match = next(match_iter, None)
+                        if next_match is not None:
+                            pending = prefetcher.submit(_load_ds, instance_path.joinpath(str(next_match.sop_instance_uid)))
+
+                        if event.is_cancelled:
+                            yield 0xFE00, None
+                            return
+
+                        try:
+                            logger.info(f"match: {match} with SOP Instance UID: {match.sop_instance_uid}")
+                            response = loading.result()
+                            logger.info(f"response Identifier: {response}")
+                            # Next line removed as only required for Query/Retrieve SOP Class
+                            # response.RetrieveAETitle = event.assoc.ae.ae_title
+                        except Exception as exc:
+                            logger.error("Error creating response Identifier")
+                            logger.exception(exc)
+                            yield 0xC322, None
+
+                        # TODO: Change to 0xFF01 when one or more Optional Keys not
+                        #  supported. See Table C.4-1. C-FIND Response Status Values
+                        yield 0xFF00, response
+                        match = next_match
             except InvalidIdentifier as exc:
                 session.rollback()
                 logger.error("Invalid C-FIND Identifier received")
@@ -272,54 +542,55 @@ def handle_find(event, instance_dir, db_path, cli_config, logger):
                 logger.exception(exc)
                 yield 0xC320, None
                 return
-            finally:
-                session.close()
-
-        # Yield results
-        for match in matches:
-            if event.is_cancelled:
-                yield 0xFE00, None
-                return
-
-            try:
-                logger.info(f"match: {match} with SOP Instance UID: {match.sop_instance_uid}")
-                response = dcmread(
-                    Path(instance_dir).joinpath(str(match.sop_instance_uid)),
-                    force=True,
-                )
-                logger.info(f"response Identifier: {response}")
-                # Next line removed as only required for Query/Retrieve SOP Class
-                # response.RetrieveAETitle = event.assoc.ae.ae_title
-            except Exception as exc:
-                logger.error("Error creating response Identifier")
-                logger.exception(exc)
-                yield 0xC322, None
-
-            # TODO: Change to 0xFF01 when one or more Optional Keys not
-            #  supported. See Table C.4-1. C-FIND Response Status Values
-            yield 0xFF00, response
+        finally:
+            session.close()
 
 
 def _reload_ups_instances(instance_dir, logger):
-    # TODO: Find a more elegant way to handle these UPS instances
-    #       and maybe allow reload if updated
-    #       right now, it's just loading the first time through, and done.
-    ups_instance_list = []
     logger.info(f"# UPS Instances currently loaded = {len(_ups_instances)}")
-    if len(_ups_instances) == 0:
-        p = Path(instance_dir)
-        list_of_dcm_ups = [x for x in p.glob("UPS_*.dcm")]
-
+    # scandir hands back the stat result with each entry, so the
+    # new-or-changed check costs no extra syscall and no fnmatch
+    new_or_updated = []
+    with os.scandir(instance_dir) as directory_entries:
+        for entry in directory_entries:
+            if not (entry.name.startswith("UPS_") and entry.name.endswith(".dcm") and entry.is_file()):
+                continue
+            mtime_ns = entry.stat().st_mtime_ns
+            if _ups_file_mtime_cache.get(entry.path) != mtime_ns:
+                new_or_updated.append((entry.path, mtime_ns))
+
+    def _read_ups(filename):
+        # a UPS has no pixel data, so stop_before_pixels costs nothing
+        # and skips the pixel-data scan; failures are per-file so one
+        # corrupt file doesn't abort the rest of the batch
         try:
-            for filename in list_of_dcm_ups:
-                ups = dcmread(filename, force=True)
-                ups_instance_list.append(ups)
-                logger.info(f"Loaded UPS from {filename}")
-        except (FileNotFoundError, InvalidDicomError, TypeError):
-            logger.warn(f"Unable to load UPS from {filename}")
-
-    for ups in ups_instance_list:
+            ups = dcmread(filename, force=True, stop_before_pixels=True)
+            # force=True parses truncated/empty files without complaint,
+            # so make sure the result is actually usable as a UPS
+            ups.SOPInstanceUID
+            return ups
+        except Exception as exc:
+            logger.warning("Unable to load UPS from %s: %s", filename, exc)
+            return None
+
+    ups_instance_list = []
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for (filename, mtime_ns), ups in zip(
+            new_or_updated,
+            executor.map(lambda x: _read_ups(x[0]), new_or_updated),
+        ):
+            if ups is None:
+                # remember the failed file's mtime so the next reload does
+                # not re-parse it; editing the file changes the mtime and
+                # triggers a fresh attempt
+                _ups_file_mtime_cache[filename] = mtime_ns
+                continue
+            ups_instance_list.append((filename, mtime_ns, ups))
+            logger.info(f"Loaded UPS from {filename}")
+
+    for filename, mtime_ns, ups in ups_instance_list:
         _add_ups_instance(ups)
+        _ups_file_mtime_cache[filename] = mtime_ns
     logger.info(f"# UPS Instances loaded from {instance_dir} = {len(_ups_instances)}")
 
 
@@ -345,10 +616,12 @@ def handle_nget(event, db_path, cli_config, logger):
         The N-GET response's *Status* and if the *Status* is pending then
         the dataset to be sent, otherwise ``None``.
     """
-    requestor = event.assoc.requestor
-    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-    addr, port = requestor.address, requestor.port
-    logger.info(f"Received N-GET request from {addr}:{port} at {timestamp}")
+    # skip the strftime/attribute-chain work entirely when INFO is
+    # filtered out; %-style args let the logging module defer formatting
+    if logger.isEnabledFor(logging.INFO):
+        requestor = event.assoc.requestor
+        timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("Received N-GET request from %s:%s at %s", requestor.address, requestor.port, timestamp)
 
     model = event.request.RequestedSOPClassUID
     if len(model) == 0:
@@ -362,13 +635,35 @@ def handle_nget(event, db_path, cli_config, logger):
     if ds_from_request.SOPInstanceUID is None or len(ds_from_request.SOPInstanceUID) == 0:
         print("Requested SOP Instance UID is empty")
 
-    engine = create_engine(db_path)
-    with engine.connect() as conn:  # noqa:  F841
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        # Search database using Identifier as the query
+    # Search database using Identifier as the query; the session stays
+    # open until the streaming cursor has been fully iterated
+    session = _get_session(db_path)
+    try:
         try:
-            matches = search(model, ds_from_request, session)
+            matches = search_iter(model, ds_from_request, session)
+
+            # Yield results
+            for match in matches:
+                if event.is_cancelled:
+                    yield 0xFE00, None
+                    return
+
+                try:
+                    print(f"N-GET handler: matched on {match.filename}")
+                    ds = _load_ds(match.filename)
+                    print(ds)
+                    ds.is_implicit_VR = False
+                    ds.ensure_file_meta()
+                    ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
+                    ds.fix_meta_info()
+                    ds.Status = 0x0000
+                except Exception as exc:
+                    logger.error(f"Error reading file: {match.filename}")
+                    logger.exception(exc)
+                    yield 0xC421, None
+
+                yield 0x0000
+                yield ds
         except InvalidIdentifier as exc:
             session.rollback()
             logger.error("Invalid N-GET Identifier received")
@@ -381,34 +676,96 @@ def handle_nget(event, db_path, cli_config, logger):
             logger.exception(exc)
             yield 0xC420, None
             return
-        finally:
-            session.close()
+    finally:
+        session.close()
 
-    # Yield number of sub-operations
-    # yield len(matches)
 
-    # Yield results
-    for match in matches:
-        if event.is_cancelled:
-            yield 0xFE00, None
-            return
+def _handle_global_subscription_action(
+    action_type_id, subscribing_ae_title, deletion_lock, action_information, instance_uid, logger
+):
+    if action_type_id == 3:
+        logger.info("Request was for Subscribing to (unfiltered) Global UPS")
+        _add_global_subscriber(
+            subscribing_ae_title,
+            deletion_lock=deletion_lock,
+            logger=logger,
+        )
+        return 0x0000
+    elif action_type_id == 4:
+        logger.info("Request was for Unsubscribing to (unfiltered) Global UPS")
+        _remove_global_subscriber(subscribing_ae_title, logger=logger)
+        _remove_filtered_subscriber(subscribing_ae_title, logger=logger)
+        return 0x0000
+    elif action_type_id == 5:
+        logger.info("Request was for Suspend Global (unfiltered) Subscription")
+        logger.warning("Suspend Global (unfiltered) Subscription is not yet supported")
+        # Respond with an Unrecognized Operation Error
+        return 0x0211
+    else:
+        logger.error("invalid action_type_id")
+        # Respond with an Unrecognized Operation Error
+        return 0x0211
 
-        try:
-            print(f"N-GET handler: matched on {match.filename}")
-            ds = dcmread(match.filename)
-            print(ds)
-            ds.is_implicit_VR = False
-            ds.ensure_file_meta()
-            ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
-            ds.fix_meta_info()
-            ds.Status = 0x0000
-        except Exception as exc:
-            logger.error(f"Error reading file: {match.filename}")
-            logger.exception(exc)
-            yield 0xC421, None
 
-        yield 0x0000
-        yield ds
+def _handle_filtered_subscription_action(
+    action_type_id, subscribing_ae_title, deletion_lock, action_information, instance_uid, logger
+):
+    if action_type_id == 3:
+        logger.info("Request was for Subscribing to Filtered Global UPS")
+        _add_filtered_subscriber(subscribing_ae_title, action_information, logger=logger)
+        return 0x0000
+    elif action_type_id == 4:  # TODO: return an error in this case as not compliant
+        logger.error("invalid well-known UID for Unsubscribe Action Type")
+        # Respond with an Unrecognized Operation Error
+        return 0xC314
+    else:
+        logger.error("invalid action_type_id")
+        # Respond with an Unrecognized Operation Error
+        return 0x0211
+
+
+def _handle_ups_instance_subscription_action(
+    action_type_id, subscribing_ae_title, deletion_lock, action_information, instance_uid, logger
+):
+    if action_type_id == 3:
+        logger.info(f"Request was for Subscribing to UPS Instance {instance_uid}")
+        logger.warning("Subscribing to specifc UPS Instances is not yet supported")
+        # Respond with an Unrecognized Operation Error
+        return 0x0211
+    elif action_type_id == 4:
+        logger.info(f"Request was for Unsubscribing from UPS Instance {instance_uid}")
+        logger.warning("Unsubscribing from specifc UPS Instances is not yet supported")
+        # Respond with an Unrecognized Operation Error
+        return 0x0211
+    else:
+        logger.error("invalid action_type_id")
+        # Respond with an Unrecognized Operation Error
+        return 0xC314
+
+
+# Subscription N-ACTION requests dispatch on the Requested SOP Instance
+# UID; a single hash lookup replaces the chain of UID comparisons and
+# stays flat as more well-known UIDs are supported
+_SUBSCRIPTION_ACTION_HANDLERS = {
+    UPSGlobalSubscriptionInstance: _handle_global_subscription_action,
+    UPSFilteredGlobalSubscriptionInstance: _handle_filtered_subscription_action,
+}
+
+
+def _new_naction_response():
+    """Return an empty N-ACTION response dataset with the fixed encoding flags.
+
+    A module-level template cloned with ``copy.copy`` would be cheaper
+    still, but a shallow copy of a pydicom ``Dataset`` shares the
+    underlying element dict, so per-request *Status*/*Error Comment*
+    writes would leak into every later response.  The flags below are
+    plain instance attributes, so building the response here keeps the
+    construction in one place at the same cost.
+    """
+    response = Dataset()
+    response.is_little_endian = True
+    response.is_implicit_VR = True
+    return response
 
 
 def handle_naction(event, instance_dir, db_path, cli_config, logger):
@@ -433,10 +790,12 @@ def handle_naction(event, instance_dir, db_path, cli_config, logger):
         The C-GET response's *Status* and if the *Status* is pending then
         the dataset to be sent, otherwise ``None``.
     """
-    requestor = event.assoc.requestor
-    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-    addr, port = requestor.address, requestor.port
-    logger.info(f"Received N-ACTION request from {addr}:{port} at {timestamp}")
+    # skip the strftime/attribute-chain work entirely when INFO is
+    # filtered out; %-style args let the logging module defer formatting
+    if logger.isEnabledFor(logging.INFO):
+        requestor = event.assoc.requestor
+        timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("Received N-ACTION request from %s:%s at %s", requestor.address, requestor.port, timestamp)
 
     # model = event.request.AffectedSOPClassUID
     # logger.info(f"Model = {model}")
@@ -476,11 +835,9 @@ def handle_naction(event, instance_dir, db_path, cli_config, logger):
     service_status = 0x0000
     # sub_operations_remaining = 0
     # in case things go wrong
-    error_response = Dataset()
-    error_response.is_little_endian = True
-    error_response.is_implicit_VR = True
+    error_response = _new_naction_response()
 
-    happy_response = Dataset()
+    happy_response = _new_naction_response()
     happy_response.Status = service_status  # change this if things go wrong
     # happy_response.update(action_information) # apparently not all elements get to go back in a status dataset
 
@@ -502,78 +859,24 @@ def handle_naction(event, instance_dir, db_path, cli_config, logger):
             logger.warn("No action information available!")
             # TODO... service_status = some error code
 
-        # TODO:  use action_type_id to determine if this is subscribe or unsubscribe
-        if naction_primitive.RequestedSOPInstanceUID == UPSGlobalSubscriptionInstance:
-            if action_type_id == 3:
-                logger.info("Request was for Subscribing to (unfiltered) Global UPS")
-                _add_global_subscriber(
-                    subscribing_ae_title,
-                    deletion_lock=deletion_lock,
-                    logger=logger,
-                )
-            elif action_type_id == 4:
-                logger.info("Request was for Unsubscribing to (unfiltered) Global UPS")
-                _remove_global_subscriber(subscribing_ae_title, logger=logger)
-                _remove_filtered_subscriber(subscribing_ae_title, logger=logger)
-            elif action_type_id == 5:
-                logger.info("Request was for Suspend Global (unfiltered) Subscription")
-                logger.warning("Suspend Global (unfiltered) Subscription is not yet supported")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0x0211
-                yield error_response
-                yield None
-                return
-            else:
-                logger.error("invalid action_type_id")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0x0211
-                yield error_response
-                yield None
-                return
-
-        elif naction_primitive.RequestedSOPInstanceUID == UPSFilteredGlobalSubscriptionInstance:
-            if action_type_id == 3:
-                logger.info("Request was for Subscribing to Filtered Global UPS")
-                _add_filtered_subscriber(subscribing_ae_title, action_information, logger=logger)
-            elif action_type_id == 4:  # TODO: return an error in this case as not compliant
-                logger.error("invalid well-known UID for Unsubscribe Action Type")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0xC314
-                yield error_response
-                yield None
-                return
-            else:
-                logger.error("invalid action_type_id")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0x0211
-                yield error_response
-                yield None
-                return
-        else:
-            instance_uid = naction_primitive.RequestedSOPInstanceUID
-            if action_type_id == 3:
-                logger.info(f"Request was for Subscribing to UPS Instance {instance_uid}")
-                logger.warning("Subscribing to specifc UPS Instances is not yet supported")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0x0211
-                yield error_response
-                yield None
-                return
-            elif action_type_id == 4:
-                logger.info(f"Request was for Unsubscribing from UPS Instance {instance_uid}")
-                logger.warning("Unsubscribing from specifc UPS Instances is not yet supported")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0x0211
-                yield error_response
-                yield None
-                return
-            else:
-                logger.error("invalid action_type_id")
-                # Respond with an Unrecognized Operation Error
-                error_response.Status = 0xC314
-                yield error_response
-                yield None
-                return
+        # a single hash lookup on the well-known UID picks the
+        # subscribe/unsubscribe behaviour; unknown UIDs are treated as
+        # (not yet supported) single UPS instance subscriptions
+        instance_uid = naction_primitive.RequestedSOPInstanceUID
+        subscription_action_handler = _SUBSCRIPTION_ACTION_HANDLERS.get(instance_uid, _handle_ups_instance_subscription_action)
+        service_status = subscription_action_handler(
+            action_type_id,
+            subscribing_ae_title,
+            deletion_lock,
+            action_information,
+            instance_uid,
+            logger,
+        )
+        if service_status != 0x0000:
+            error_response.Status = service_status
+            yield error_response
+            yield None
+            return
 
         yield happy_response
         yield None
@@ -581,137 +884,132 @@ def handle_naction(event, instance_dir, db_path, cli_config, logger):
     # yield action_information
     else:
         # This is a ProcedureStepState change request...
-        engine = create_engine(db_path)
         service_status = 0x0000
-        with engine.connect() as conn:  # noqa:  F841
-            Session = sessionmaker(bind=engine)
-            session = Session()
-            model = None
-            # Search database using Identifier as the query
-            print(f"naction_primitive = {naction_primitive}")
-            print(f"action information = {action_information}")
-
-            if model is None:
-                try:
-                    model = naction_primitive.RequestedSOPClassUID
-                except AttributeError:
-                    try:
-                        model = naction_primitive.AffectedSOPClassUID
-                    except AttributeError:
-                        raise
+        session = _get_session(db_path)
+        model = None
+        # Search database using Identifier as the query
+        print(f"naction_primitive = {naction_primitive}")
+        print(f"action information = {action_information}")
 
-            if action_information is not None:
+        if model is None:
+            try:
+                model = naction_primitive.RequestedSOPClassUID
+            except AttributeError:
                 try:
-                    logger.info(f"{action_information}")
-                except Exception as exc:
-                    logger.info(f"Unable to decode action information: {exc}")
-            else:
-                logger.info("No action information")
+                    model = naction_primitive.AffectedSOPClassUID
+                except AttributeError:
+                    raise
 
+        if action_information is not None:
             try:
-                search_ds = Dataset()  # (action_information)
-                transaction_uid = action_information.TransactionUID
-                requested_step_state = action_information.ProcedureStepState
-                if "RequestedSOPInstanceUID" in action_information:
-                    search_ds.SOPInstanceUID = action_information.RequestedSOPInstanceUID
-                else:
-                    search_ds.SOPInstanceUID = naction_primitive.RequestedSOPInstanceUID
-                # search_ds.SOPClassUID = action_information.RequestedSOPClassUID
-                matches = search(model, search_ds, session)
-                if matches is None or (len(matches) < 1):
-                    error_str = f"No Matching SOP Instance UID: {search_ds.SOPInstanceUID}"
-                    logger.error(error_str)
-                    session.close()
-                    error_response.ErrorComment = error_str[0:59] + " ..."
-                    error_response.Status = 0xC307
-                    yield error_response
-                    yield None
-                    return
-                if len(matches) > 1:
-                    logger.error("Internal Error: More than one match for the given SOP Instance UID")
-                match = matches[0]
-                current_step_state = match.procedure_step_state
-                stored_transaction_uid = match.transaction_uid
-                service_status = _SERVICE_STATUS[current_step_state][requested_step_state]
-
-                if transaction_uid is None and current_step_state != "SCHEDULED":
-                    logging.error("Transaction UID is None, and current step state is not SCHEDULED")
-                elif len(transaction_uid) == 0 and current_step_state != "SCHEDULED":
-                    logging.error("Transaction UID is zero length, and current step state is not SCHEDULED")
-                elif current_step_state != "SCHEDULED" and str(transaction_uid) != str(stored_transaction_uid):
-                    logging.error("Current Step state is not SCHEDULED, but transaction uids don't match")
-                    error_message = (
-                        f"Provided Transaction UID {transaction_uid}, vs. Stored Transaction UID {stored_transaction_uid}"
-                    )
-                    logging.error(error_message)
-
-                if (
-                    (transaction_uid is None)
-                    or (len(transaction_uid) == 0)  # noqa: W503,W504
-                    or (current_step_state != "SCHEDULED" and transaction_uid != stored_transaction_uid)  # noqa: W503,W504
-                ):
-                    service_status = 0xC301
-                    error_str = "Transaction UID is missing, zero length, or not valid"
-                    error_response.ErrorComment = error_str[:63]
-                    logger.error(f"Service Status: 0x{service_status:X}")
-                    logger.error(error_str)
-                    error_response.Status = service_status
-                    # yield service_status
-                    yield error_response
-                    yield None
-                    return
+                logger.info(f"{action_information}")
+            except Exception as exc:
+                logger.info(f"Unable to decode action information: {exc}")
+        else:
+            logger.info("No action information")
 
-                if service_status != 0x0000:
-                    error_response.ErrorComment = f"Current Step State {current_step_state}, \
-                        requested Step State {requested_step_state}"
-                    logger.error(f"Service Status: 0x{service_status:X}")
-                    error_response.Status = service_status
-                    # yield service_status
-                    yield error_response
-                    yield None
-                    return
-                logger.info(f"Matching instance: {match}")
-                logger.info(f"Stored Procedure Step State: {current_step_state}")
-                logger.info(f"Requested Procedure Step State: {requested_step_state}")
-                response = dcmread(
-                    Path(instance_dir).joinpath(str(match.sop_instance_uid)),
-                    force=True,
-                )
-                response.ProcedureStepState = requested_step_state
-                response.is_little_endian = True
-                response.is_implicit_VR = True
-                # Updates to content of database below for next state change request
-                match.procedure_step_state = requested_step_state
-                match.transaction_uid = transaction_uid
-                session.commit()
-                # Update to the blob/dicom file.  Probably not as important here, but will be important for N-SET
-                dcmwrite(
-                    Path(instance_dir).joinpath(str(match.sop_instance_uid)),
-                    response,
-                    write_like_original=True,
+        try:
+            search_ds = Dataset()  # (action_information)
+            transaction_uid = action_information.TransactionUID
+            requested_step_state = action_information.ProcedureStepState
+            if "RequestedSOPInstanceUID" in action_information:
+                search_ds.SOPInstanceUID = action_information.RequestedSOPInstanceUID
+            else:
+                search_ds.SOPInstanceUID = naction_primitive.RequestedSOPInstanceUID
+            # search_ds.SOPClassUID = action_information.RequestedSOPClassUID
+            matches = search(model, search_ds, session)
+            if matches is None or (len(matches) < 1):
+                error_str = f"No Matching SOP Instance UID: {search_ds.SOPInstanceUID}"
+                logger.error(error_str)
+                session.close()
+                error_response.ErrorComment = error_str[0:59] + " ..."
+                error_response.Status = 0xC307
+                yield error_response
+                yield None
+                return
+            if len(matches) > 1:
+                logger.error("Internal Error: More than one match for the given SOP Instance UID")
+            match = matches[0]
+            current_step_state = match.procedure_step_state
+            stored_transaction_uid = match.transaction_uid
+            service_status = _SERVICE_STATUS[current_step_state][requested_step_state]
+
+            if transaction_uid is None and current_step_state != "SCHEDULED":
+                logging.error("Transaction UID is None, and current step state is not SCHEDULED")
+            elif len(transaction_uid) == 0 and current_step_state != "SCHEDULED":
+                logging.error("Transaction UID is zero length, and current step state is not SCHEDULED")
+            elif current_step_state != "SCHEDULED" and str(transaction_uid) != str(stored_transaction_uid):
+                logging.error("Current Step state is not SCHEDULED, but transaction uids don't match")
+                error_message = (
+                    f"Provided Transaction UID {transaction_uid}, vs. Stored Transaction UID {stored_transaction_uid}"
                 )
-                response.TransactionUID = transaction_uid
-                response.Status = service_status
-                print(f"response content: {response}")
-                yield service_status
-                yield response
+                logging.error(error_message)
+
+            if (
+                (transaction_uid is None)
+                or (len(transaction_uid) == 0)  # noqa: W503,W504
+                or (current_step_state != "SCHEDULED" and transaction_uid != stored_transaction_uid)  # noqa: W503,W504
+            ):
+                service_status = 0xC301
+                error_str = "Transaction UID is missing, zero length, or not valid"
+                error_response.ErrorComment = error_str[:63]
+                logger.error(f"Service Status: 0x{service_status:X}")
+                logger.error(error_str)
+                error_response.Status = service_status
+                # yield service_status
+                yield error_response
+                yield None
+                return
 
-            except InvalidIdentifier as exc:
-                session.rollback()
-                logger.error("Invalid N-Action Identifier received")
-                logger.error(str(exc))
-                yield 0
-                yield 0xA900
+            if service_status != 0x0000:
+                error_response.ErrorComment = f"Current Step State {current_step_state}, \
+                    requested Step State {requested_step_state}"
+                logger.error(f"Service Status: 0x{service_status:X}")
+                error_response.Status = service_status
+                # yield service_status
+                yield error_response
+                yield None
+                return
+            logger.info(f"Matching instance: {match}")
+            logger.info(f"Stored Procedure Step State: {current_step_state}")
+            logger.info(f"Requested Procedure Step State: {requested_step_state}")
+            response = _load_ds(Path(instance_dir).joinpath(str(match.sop_instance_uid)))
+            response.ProcedureStepState = requested_step_state
+            response.is_little_endian = True
+            response.is_implicit_VR = True
+            # Updates to content of database below for next state change request
+            match.procedure_step_state = requested_step_state
+            match.transaction_uid = transaction_uid
+            session.commit()
+            # Update to the blob/dicom file.  Probably not as important here, but will be important for N-SET
+            dcmwrite(
+                Path(instance_dir).joinpath(str(match.sop_instance_uid)),
+                response,
+                write_like_original=True,
+            )
+            _invalidate_ds_cache()
+            response.TransactionUID = transaction_uid
+            response.Status = service_status
+            print(f"response content: {response}")
+            yield service_status
+            yield response
 
-            except Exception as exc:
-                session.rollback()
-                logger.error("Exception occurred while querying database")
-                logger.exception(exc)
-                yield 0
-                yield 0xC320
+        except InvalidIdentifier as exc:
+            session.rollback()
+            logger.error("Invalid N-Action Identifier received")
+            logger.error(str(exc))
+            yield 0
+            yield 0xA900
 
-            finally:
-                session.close()
+        except Exception as exc:
+            session.rollback()
+            logger.error("Exception occurred while querying database")
+            logger.exception(exc)
+            yield 0
+            yield 0xC320
+
+        finally:
+            session.close()
 
     logger.info(f"Requested SOP Class UID: {naction_primitive.RequestedSOPClassUID}")
     logger.info(f"Request dump: {naction_primitive}")
@@ -746,10 +1044,12 @@ def handle_nset(
         The N-SET response's *Status* and if the *Status* is pending then
         the dataset to be sent, otherwise ``None``.
     """
-    requestor = event.assoc.requestor
-    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-    addr, port = requestor.address, requestor.port
-    logger.info(f"Received N-SET request from {addr}:{port} at {timestamp}")
+    # skip the strftime/attribute-chain work entirely when INFO is
+    # filtered out; %-style args let the logging module defer formatting
+    if logger.isEnabledFor(logging.INFO):
+        requestor = event.assoc.requestor
+        timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("Received N-SET request from %s:%s at %s", requestor.address, requestor.port, timestamp)
     response_ds = None
     # need to manipulate the content of the request
     # also need to validate the content and reject if it's not DICOM conformant and IHE-RO
@@ -824,27 +1124,11 @@ def handle_nset(
         # the internal search needs to match on SOP Instance UID
         ds_from_request.SOPInstanceUID = event.request.RequestedSOPInstanceUID
 
-    engine = create_engine(db_path)
-    with engine.connect() as conn:  # noqa:  F841
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        # Search database using subset of ds in the N-SET-RQ as the query
-        try:
-            matches = search(model, ds_from_request, session)
-        except InvalidIdentifier as exc:
-            session.rollback()
-            logger.error("Invalid N-SET Identifier received")
-            logger.error(str(exc))
-            yield 0xA900, None
-            return
-        except Exception as exc:
-            session.rollback()
-            logger.error("Exception occurred while querying database")
-            logger.exception(exc)
-            yield 0xC420, None
-            return
-        finally:
-            session.close()
+    # Search database using subset of ds in the N-SET-RQ as the query
+    matches, search_status = _search_matches(model, ds_from_request, db_path, logger, "N-SET", 0xC420)
+    if matches is None:
+        yield search_status, None
+        return
 
     if len(matches) == 0:
         # no SOP Instance UID that matches the Affected SOP Instance UID in the request
@@ -861,7 +1145,7 @@ def handle_nset(
             return
 
         try:
-            ds = dcmread(match.filename, force=True)
+            ds = _load_ds(match.filename)
             if "ProcedureStepState" not in ds or ds["ProcedureStepState"].value != "IN PROGRESS":
                 logger.warning("Procedure Step State is not IN PROGRESS")
                 yield 0x3C10
@@ -912,6 +1196,7 @@ def handle_nset(
             ds.file_meta.TransferSyntaxUID = ExplicitVRLittleEndian
             ds.fix_meta_info()
             dcmwrite(match.filename, ds, write_like_original=False)
+            _invalidate_ds_cache()
             ds.Status = 0xFF00
             response_ds = ds
         except InvalidDicomError or TypeError as exc:
@@ -951,10 +1236,12 @@ def handle_ncreate(event, storage_dir, db_path, cli_config, logger):
         but the dataset couldn't be added to the database then the *Status*
         will still be ``0x0000`` (Success).
     """
-    requestor = event.assoc.requestor
-    timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
-    addr, port = requestor.address, requestor.port
-    logger.info(f"Received N-CREATE request from {addr}:{port} at {timestamp}")
+    # skip the strftime/attribute-chain work entirely when INFO is
+    # filtered out; %-style args let the logging module defer formatting
+    if logger.isEnabledFor(logging.INFO):
+        requestor = event.assoc.requestor
+        timestamp = event.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        logger.info("Received N-CREATE request from %s:%s at %s", requestor.address, requestor.port, timestamp)
 
     try:
         req = event.request
@@ -1022,6 +1309,7 @@ def handle_ncreate(event, storage_dir, db_path, cli_config, logger):
 
     try:
         ds.save_as(fpath, write_like_original=False)
+        _invalidate_ds_cache()
     except Exception as exc:
         logger.error("Failed writing instance to storage directory")
         logger.exception(exc)
@@ -1031,25 +1319,19 @@ def handle_ncreate(event, storage_dir, db_path, cli_config, logger):
     logger.info("Instance written to storage directory")
 
     # Dataset successfully written, try to add to/update database
-    engine = create_engine(db_path)
-    with engine.connect() as conn:  # noqa:  F841
-        Session = sessionmaker(bind=engine)
-        session = Session()
-
-        try:
-            # Path is relative to the database file
-            matches = session.query(Instance).filter(Instance.sop_instance_uid == ds.SOPInstanceUID).all()
-            add_instance(ds, session, os.path.abspath(fpath))
-            if not matches:
-                logger.info("Instance added to database")
-            else:
-                logger.info("Database entry for instance updated")
-        except Exception as exc:
-            session.rollback()
-            logger.error("Unable to add instance to the database")
-            logger.exception(exc)
-        finally:
-            session.close()
+    session = _get_session(db_path)
+    try:
+        # Path is relative to the database file
+        if add_instance(ds, session, os.path.abspath(fpath)):
+            logger.info("Instance added to database")
+        else:
+            logger.info("Database entry for instance updated")
+    except Exception as exc:
+        session.rollback()
+        logger.error("Unable to add instance to the database")
+        logger.exception(exc)
+    finally:
+        session.close()
 
     # Database successfully updated, notify any globally subscribed AE
     # Get AET of UPS Event SCP (which is the AET of the UPS Watch SCP)
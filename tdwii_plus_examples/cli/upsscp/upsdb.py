@@ -191,12 +191,19 @@ def add_instance(ds, session, fpath=None):
     fpath : str, optional
         The path to where the SOP Instance is stored, taken relative
         to the database file.
+
+    Returns
+    -------
+    bool
+        ``True`` if a new database entry was created, ``False`` if an
+        existing entry was updated.
     """
-    # Check if instance is already in the database
-    result = session.query(Instance).filter(Instance.sop_instance_uid == ds.SOPInstanceUID).all()
-    if result:
-        instance = result[0]
-    else:
+    # Check if instance is already in the database; this is the only
+    # round-trip needed, callers should use the returned flag rather
+    # than querying again themselves
+    instance = session.query(Instance).filter(Instance.sop_instance_uid == ds.SOPInstanceUID).first()
+    created = instance is None
+    if created:
         instance = Instance()
 
     # Unique or Required attributes
@@ -280,6 +287,8 @@ def add_instance(ds, session, fpath=None):
     session.add(instance)
     session.commit()
 
+    return created
+
 
 def build_query(identifier, session, query=None):
     """Perform a query against the database.
@@ -482,6 +491,47 @@ def search(model, identifier, session):
     ValueError
         If the `identifier` is invalid.
     """
+    _prune_identifier(model, identifier)
+
+    return _search_qr(model, identifier, session)
+
+
+def search_iter(model, identifier, session):
+    """Search the database, streaming the matches.
+
+    The same search as :func:`search` but returning a server-side cursor
+    that fetches matches in small batches as it is iterated, instead of
+    materializing every matching Instance up front.  The `session` must
+    stay open until iteration is finished.
+
+    Parameters
+    ----------
+    model : pydicom.uid.UID
+        The Query/Retrieve Information Model.
+    identifier : pydicom.dataset.Dataset
+        The Query/Retrieve request's *Identifier* dataset.
+    session : sqlalchemy.orm.session.Session
+        The session we are using to query the database.
+
+    Returns
+    -------
+    sqlalchemy.orm.query.Query
+        A streaming query yielding the matching database Instances.
+
+    Raises
+    ------
+    ValueError
+        If the `identifier` is invalid.
+    """
+    _prune_identifier(model, identifier)
+
+    query = _build_qr_query(model, identifier, session)
+
+    return query.execution_options(stream_results=True).yield_per(64)
+
+
+def _prune_identifier(model, identifier):
+    """Remove the keys not supported by `model` from `identifier` in place."""
     if model not in [UnifiedProcedureStepPull, UnifiedProcedureStepPush]:
         raise ValueError(f"Unknown information model '{model}'")
 
@@ -500,7 +550,33 @@ def search(model, identifier, session):
             if value[1] == "R" and kw in identifier:
                 delattr(identifier, kw)
 
-    return _search_qr(model, identifier, session)
+
+def distinct_contexts(model, identifier, session):
+    """Return the presentation contexts needed to send the matching Instances.
+
+    The distinct (*SOP Class UID*, *Transfer Syntax UID*) pairs are selected
+    by the database itself rather than deduplicating ``Instance.context``
+    objects in Python, so the matches are not materialized a second time
+    just to work out the contexts.
+
+    Parameters
+    ----------
+    model : pydicom.uid.UID
+        The Query/Retrieve Information Model.
+    identifier : pydicom.dataset.Dataset
+        The request's *Identifier* dataset.
+    session : sqlalchemy.orm.session.Session
+        The session we are using to query the database.
+
+    Returns
+    -------
+    list of pynetdicom.presentation.PresentationContext
+        At most 128 contexts, one per distinct UID pair.
+    """
+    query = _build_qr_query(model, identifier, session)
+    rows = query.with_entities(Instance.sop_class_uid, Instance.transfer_syntax_uid).distinct().limit(128).all()
+
+    return [build_context(sop_class_uid, transfer_syntax_uid) for sop_class_uid, transfer_syntax_uid in rows]
 
 
 def _search_qr(model, identifier, session):
@@ -521,6 +597,26 @@ def _search_qr(model, identifier, session):
     list of db.Instance
         The Instances that match the query.
     """
+    return _build_qr_query(model, identifier, session).all()
+
+
+def _build_qr_query(model, identifier, session):
+    """Build the Query/Retrieve query without executing it.
+
+    Parameters
+    ----------
+    model : pydicom.uid.UID
+        The Query/Retrieve Information Model.
+    identifier : pydicom.dataset.Dataset
+        The request's *Identifier* dataset.
+    session : sqlalchemy.orm.session.Session
+        The session we are using to query the database.
+
+    Returns
+    -------
+    sqlalchemy.orm.query.Query
+        The resulting query.
+    """
     # Will raise InvalidIdentifier if check failed
     # _check_identifier(identifier, model)
 
@@ -542,7 +638,7 @@ def _search_qr(model, identifier, session):
         # if level == identifier.QueryRetrieveLevel:
         #    break
 
-    return query.all()
+    return query
 
 
 def _search_range(elem, session, query=None):
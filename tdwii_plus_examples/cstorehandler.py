@@ -107,8 +107,13 @@ def handle_cstore(event, args, app_logger):
     try:
         ds = event.dataset
         # Remove any File Meta Information elements (group 0x0002) elements
-        # that may have been included
-        ds = ds[0x00030000:]
+        # that may have been included.  Delete them in place; the tags are
+        # kept ordered so iteration can stop at the first element past
+        # group 0x0002 instead of rebuilding the whole data set via a slice
+        for tag in list(ds.keys()):
+            if tag.group > 0x0002:
+                break
+            del ds[tag]
     except Exception:
         app_logger.exception("Unable to decode the data set")
         status_ds.Status = Status.UNABLE_TO_DECODE_DATASET
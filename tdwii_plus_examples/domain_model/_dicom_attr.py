@@ -0,0 +1,113 @@
+"""Shared data descriptor for the generated sequence item wrapper classes."""
+
+import sys
+from typing import Any, Optional  # noqa
+
+from pydicom.datadict import dictionary_VR, tag_for_keyword
+from pydicom.dataelem import DataElement
+from pydicom.dataset import Dataset
+from pydicom.tag import Tag
+
+
+class DicomAttr:
+    """Data descriptor forwarding a DICOM attribute to the wrapped dataset
+
+    Declaring ``SomeKeyword = DicomAttr("SomeKeyword")`` in a wrapper class
+    body replaces a hand-written property getter/setter pair.  All wrapper
+    attributes then share one small compiled code path instead of carrying
+    near-identical bytecode per attribute.
+
+    The keyword is resolved to its tag and VR once at class creation, so
+    the accessors address the dataset by tag directly instead of going
+    through pydicom's keyword lookup on every access.
+
+    The module is kept fully annotated so it can be compiled as-is (e.g.
+    with mypyc or Cython's pure-Python mode) should the accessor overhead
+    ever warrant a C extension; the plain-Python form stays the importable
+    source of truth.
+    """
+
+    __slots__ = ("name", "tag", "vr")
+
+    def __init__(self, name: str) -> None:
+        tag = tag_for_keyword(name)
+        if tag is None:
+            raise ValueError(f"'{name}' is not a known DICOM keyword")
+        # interned so any name-keyed dict probe (e.g. from_mapping lookups,
+        # setattr on the class) hits the pointer-identity fast path
+        self.name: str = sys.intern(name)
+        self.tag: Tag = Tag(tag)
+        self.vr: str = dictionary_VR(tag)
+
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            return self
+        # the wrapped dataset is materialized lazily; no dataset yet means
+        # nothing has been stored
+        ds = obj.dataset
+        if ds is None:
+            return None
+        # present is the common case for populated items: index once
+        # (which also converts any raw element) and let the rare missing
+        # case pay for the exception, instead of going through
+        # Dataset.get's extra call layer on every read
+        try:
+            return ds[self.tag].value
+        except KeyError:
+            return None
+
+    def __set__(self, obj: Any, value: Any) -> None:
+        ds = obj.dataset
+        if value is None:
+            if ds is not None:
+                ds.pop(self.tag, None)
+        else:
+            if ds is None:
+                ds = obj.dataset = Dataset()
+            ds[self.tag] = DataElement(self.tag, self.vr, value)
+
+    def __delete__(self, obj: Any) -> None:
+        ds = obj.dataset
+        if ds is not None:
+            ds.pop(self.tag, None)
+
+
+def dicom_attrs(*names: str):
+    """Class decorator installing a :class:`DicomAttr` per keyword in `names`.
+
+    Collapses a column of ``SomeKeyword = DicomAttr("SomeKeyword")``
+    declarations into one line listing the keywords.  Descriptors are still
+    what serve the accesses - unlike a ``__getattr__`` fallback they are
+    found on the type without first missing the instance lookup.
+    """
+
+    def install(cls: type) -> type:
+        attrs = {}
+        for name in names:
+            attr = DicomAttr(name)
+            # key the class dict and the lookup table by the interned name
+            setattr(cls, attr.name, attr)
+            attrs[attr.name] = attr
+        cls._dicom_attrs = attrs
+        cls.from_mapping = classmethod(_from_mapping)
+        return cls
+
+    return install
+
+
+def _from_mapping(cls: type, mapping: Any) -> Any:
+    """Build an item from a ``{keyword: value}`` mapping in one pass.
+
+    Populates the backing dataset through the descriptors' cached tags and
+    VRs, one tight loop instead of one descriptor invocation per attribute.
+    ``None`` values are skipped, matching the per-attribute setters.
+    Installed on decorated classes as ``from_mapping``.
+    """
+    self = cls()
+    attrs = cls._dicom_attrs
+    ds = self.to_dataset()
+    for name, value in mapping.items():
+        attr = attrs[name]
+        if value is not None:
+            ds[attr.tag] = DataElement(attr.tag, attr.vr, value)
+    return self
@@ -2,38 +2,20 @@ from typing import Any, List, Optional  # noqa
 
 import pydicom
 
+from ._dicom_attr import dicom_attrs
 
+
+@dicom_attrs("ResourceDescription", "RetrieveURI")
 class PertinentResourcesSequenceItem:
+    # no per-instance __dict__; the wrapped dataset is the only state
+    __slots__ = ("dataset",)
+
     def __init__(self, dataset: Optional[pydicom.Dataset] = None):
-        self._dataset = dataset if dataset is not None else pydicom.Dataset()
+        # the backing Dataset is materialized on first write or on
+        # to_dataset(), so empty wrappers cost no Dataset allocation
+        self.dataset = dataset
 
     def to_dataset(self) -> pydicom.Dataset:
-        return self._dataset
-
-    @property
-    def ResourceDescription(self) -> Optional[str]:
-        if "ResourceDescription" in self._dataset:
-            return self._dataset.ResourceDescription
-        return None
-
-    @ResourceDescription.setter
-    def ResourceDescription(self, value: Optional[str]):
-        if value is None:
-            if "ResourceDescription" in self._dataset:
-                del self._dataset.ResourceDescription
-        else:
-            self._dataset.ResourceDescription = value
-
-    @property
-    def RetrieveURI(self) -> Optional[str]:
-        if "RetrieveURI" in self._dataset:
-            return self._dataset.RetrieveURI
-        return None
-
-    @RetrieveURI.setter
-    def RetrieveURI(self, value: Optional[str]):
-        if value is None:
-            if "RetrieveURI" in self._dataset:
-                del self._dataset.RetrieveURI
-        else:
-            self._dataset.RetrieveURI = value
+        if self.dataset is None:
+            self.dataset = pydicom.Dataset()
+        return self.dataset
@@ -33,8 +33,7 @@ class TreatmentToleranceViolationSequenceItem:
     def OverrideSequence(self, value: Optional[List[OverrideSequenceItem]]):
         if value is None:
             self._OverrideSequence = []
-            if "OverrideSequence" in self._dataset:
-                del self._dataset.OverrideSequence
+            self._dataset.pop("OverrideSequence", None)
         elif not isinstance(value, list) or not all(isinstance(item, OverrideSequenceItem) for item in value):
             raise ValueError("OverrideSequence must be a list of OverrideSequenceItem objects")
         else:
@@ -61,8 +60,7 @@ class TreatmentToleranceViolationSequenceItem:
     @TreatmentToleranceViolationCategory.setter
     def TreatmentToleranceViolationCategory(self, value: Optional[str]):
         if value is None:
-            if "TreatmentToleranceViolationCategory" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationCategory
+            self._dataset.pop("TreatmentToleranceViolationCategory", None)
         else:
             self._dataset.TreatmentToleranceViolationCategory = value
 
@@ -86,8 +84,7 @@ class TreatmentToleranceViolationSequenceItem:
     ):
         if value is None:
             self._TreatmentToleranceViolationAttributeSequence = []
-            if "TreatmentToleranceViolationAttributeSequence" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationAttributeSequence
+            self._dataset.pop("TreatmentToleranceViolationAttributeSequence", None)
         elif not isinstance(value, list) or not all(
             isinstance(item, TreatmentToleranceViolationAttributeSequenceItem) for item in value
         ):
@@ -119,8 +116,7 @@ class TreatmentToleranceViolationSequenceItem:
     @TreatmentToleranceViolationDescription.setter
     def TreatmentToleranceViolationDescription(self, value: Optional[str]):
         if value is None:
-            if "TreatmentToleranceViolationDescription" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationDescription
+            self._dataset.pop("TreatmentToleranceViolationDescription", None)
         else:
             self._dataset.TreatmentToleranceViolationDescription = value
 
@@ -133,8 +129,7 @@ class TreatmentToleranceViolationSequenceItem:
     @TreatmentToleranceViolationIdentification.setter
     def TreatmentToleranceViolationIdentification(self, value: Optional[str]):
         if value is None:
-            if "TreatmentToleranceViolationIdentification" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationIdentification
+            self._dataset.pop("TreatmentToleranceViolationIdentification", None)
         else:
             self._dataset.TreatmentToleranceViolationIdentification = value
 
@@ -147,8 +142,7 @@ class TreatmentToleranceViolationSequenceItem:
     @TreatmentToleranceViolationDateTime.setter
     def TreatmentToleranceViolationDateTime(self, value: Optional[str]):
         if value is None:
-            if "TreatmentToleranceViolationDateTime" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationDateTime
+            self._dataset.pop("TreatmentToleranceViolationDateTime", None)
         else:
             self._dataset.TreatmentToleranceViolationDateTime = value
 
@@ -167,8 +161,7 @@ class TreatmentToleranceViolationSequenceItem:
     def TreatmentToleranceViolationTypeCodeSequence(self, value: Optional[List[CodeSequenceItem]]):
         if value is None:
             self._TreatmentToleranceViolationTypeCodeSequence = []
-            if "TreatmentToleranceViolationTypeCodeSequence" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationTypeCodeSequence
+            self._dataset.pop("TreatmentToleranceViolationTypeCodeSequence", None)
         elif not isinstance(value, list) or not all(isinstance(item, CodeSequenceItem) for item in value):
             raise ValueError("TreatmentToleranceViolationTypeCodeSequence must be a list of CodeSequenceItem objects")
         else:
@@ -201,8 +194,7 @@ class TreatmentToleranceViolationSequenceItem:
     def TreatmentToleranceViolationCauseCodeSequence(self, value: Optional[List[CodeSequenceItem]]):
         if value is None:
             self._TreatmentToleranceViolationCauseCodeSequence = []
-            if "TreatmentToleranceViolationCauseCodeSequence" in self._dataset:
-                del self._dataset.TreatmentToleranceViolationCauseCodeSequence
+            self._dataset.pop("TreatmentToleranceViolationCauseCodeSequence", None)
         elif not isinstance(value, list) or not all(isinstance(item, CodeSequenceItem) for item in value):
             raise ValueError("TreatmentToleranceViolationCauseCodeSequence must be a list of CodeSequenceItem objects")
         else:
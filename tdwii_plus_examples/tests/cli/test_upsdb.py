@@ -0,0 +1,80 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from pydicom import uid
+from pydicom.dataset import Dataset
+from pynetdicom.sop_class import UnifiedProcedureStepPull, UnifiedProcedureStepPush
+from sqlalchemy.orm import sessionmaker
+
+from tdwii_plus_examples.cli.upsscp import upsdb
+
+
+def create_ups(sop_instance_uid=None, transfer_syntax_uid=uid.ImplicitVRLittleEndian):
+    ds = Dataset()
+    ds.SOPClassUID = UnifiedProcedureStepPush
+    ds.SOPInstanceUID = sop_instance_uid if sop_instance_uid is not None else uid.generate_uid()
+    ds.PatientID = "123456"
+    ds.PatientName = "Test^Patient"
+    ds.ProcedureStepState = "SCHEDULED"
+    file_meta = Dataset()
+    file_meta.TransferSyntaxUID = transfer_syntax_uid
+    ds.file_meta = file_meta
+    return ds
+
+
+class TestAddInstance(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_location = "sqlite:///" + str(Path(self.temp_dir.name).joinpath("instances.sqlite"))
+        engine = upsdb.create(db_location)
+        self.session = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.temp_dir.cleanup()
+
+    def test_add_instance_reports_insert_vs_update(self):
+        ds = create_ups()
+        self.assertTrue(upsdb.add_instance(ds, self.session))
+        # a second add of the same SOP Instance UID is an update
+        self.assertFalse(upsdb.add_instance(ds, self.session))
+        matches = self.session.query(upsdb.Instance).filter(upsdb.Instance.sop_instance_uid == ds.SOPInstanceUID).all()
+        self.assertEqual(len(matches), 1)
+
+
+class TestDistinctContexts(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        db_location = "sqlite:///" + str(Path(self.temp_dir.name).joinpath("instances.sqlite"))
+        engine = upsdb.create(db_location)
+        self.session = sessionmaker(bind=engine)()
+
+    def tearDown(self):
+        self.session.close()
+        self.temp_dir.cleanup()
+
+    def test_one_context_per_distinct_uid_pair(self):
+        # two instances sharing a transfer syntax, one with a different one
+        for transfer_syntax_uid in (uid.ImplicitVRLittleEndian, uid.ImplicitVRLittleEndian, uid.ExplicitVRLittleEndian):
+            upsdb.add_instance(create_ups(transfer_syntax_uid=transfer_syntax_uid), self.session)
+
+        query = Dataset()
+        query.ProcedureStepState = "SCHEDULED"
+        contexts = upsdb.distinct_contexts(UnifiedProcedureStepPull, query, self.session)
+
+        self.assertEqual(len(contexts), 2)
+        for context in contexts:
+            self.assertEqual(context.abstract_syntax, UnifiedProcedureStepPush)
+        transfer_syntaxes = {context.transfer_syntax[0] for context in contexts}
+        self.assertEqual(transfer_syntaxes, {uid.ImplicitVRLittleEndian, uid.ExplicitVRLittleEndian})
+
+    def test_non_matching_identifier_yields_no_contexts(self):
+        upsdb.add_instance(create_ups(), self.session)
+        query = Dataset()
+        query.ProcedureStepState = "COMPLETED"
+        self.assertEqual(upsdb.distinct_contexts(UnifiedProcedureStepPull, query, self.session), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
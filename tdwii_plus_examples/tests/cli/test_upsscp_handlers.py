@@ -0,0 +1,198 @@
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+from pydicom import dcmwrite, uid
+from pydicom.dataset import Dataset
+
+from tdwii_plus_examples import tdwii_config
+from tdwii_plus_examples.cli.upsscp import handlers
+
+# importing handlers loads the sample AE config into tdwii_config's
+# module-level dicts as a side effect; clear them so tests that expect
+# tdwii_config in its pristine import state are unaffected by ordering
+tdwii_config.known_ae_ipaddr.clear()
+tdwii_config.known_ae_port.clear()
+
+
+def create_ups(machine_name="TDS1", step_state="SCHEDULED"):
+    ds = Dataset()
+    ds.SOPInstanceUID = uid.generate_uid()
+    ds.ProcedureStepState = step_state
+    station_name_item = Dataset()
+    station_name_item.CodeValue = machine_name
+    station_name_item.CodingSchemeDesignator = "99IHERO2008"
+    ds.ScheduledStationNameCodeSequence = [station_name_item]
+    return ds
+
+
+def create_query(machine_name=None, step_state=None):
+    query = Dataset()
+    if step_state is not None:
+        query.ProcedureStepState = step_state
+    if machine_name is not None:
+        station_name_item = Dataset()
+        station_name_item.CodeValue = machine_name
+        query.ScheduledStationNameCodeSequence = [station_name_item]
+    return query
+
+
+class TestUPSInstanceSearch(unittest.TestCase):
+    def setUp(self):
+        for ups in list(handlers._ups_instances.values()):
+            handlers._remove_ups_instance(ups)
+        handlers._ups_file_mtime_cache.clear()
+
+    def test_add_and_remove_ups_instance(self):
+        ups = create_ups()
+        handlers._add_ups_instance(ups)
+        self.assertEqual(len(handlers._ups_instances), 1)
+        # adding the same instance twice must not duplicate it
+        handlers._add_ups_instance(ups)
+        self.assertEqual(len(handlers._ups_instances), 1)
+        handlers._remove_ups_instance(ups)
+        self.assertEqual(len(handlers._ups_instances), 0)
+
+    def test_search_ups_by_machine_name(self):
+        tds1_ups = create_ups(machine_name="TDS1")
+        tds2_ups = create_ups(machine_name="TDS2")
+        handlers._add_ups_instance(tds1_ups)
+        handlers._add_ups_instance(tds2_ups)
+
+        matches = list(handlers._search_ups(create_query(machine_name="TDS1")))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].SOPInstanceUID, tds1_ups.SOPInstanceUID)
+
+    def test_search_ups_by_step_state(self):
+        scheduled_ups = create_ups(step_state="SCHEDULED")
+        completed_ups = create_ups(step_state="COMPLETED")
+        handlers._add_ups_instance(scheduled_ups)
+        handlers._add_ups_instance(completed_ups)
+
+        matches = list(handlers._search_ups(create_query(step_state="COMPLETED")))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].SOPInstanceUID, completed_ups.SOPInstanceUID)
+
+    def test_search_ups_without_predicates_matches_all(self):
+        handlers._add_ups_instance(create_ups(machine_name="TDS1"))
+        handlers._add_ups_instance(create_ups(machine_name="TDS2"))
+
+        matches = list(handlers._search_ups(create_query()))
+        self.assertEqual(len(matches), 2)
+
+    def test_remove_middle_instance_keeps_store_consistent(self):
+        first_ups = create_ups(machine_name="TDS1")
+        second_ups = create_ups(machine_name="TDS2")
+        third_ups = create_ups(machine_name="TDS3")
+        for ups in (first_ups, second_ups, third_ups):
+            handlers._add_ups_instance(ups)
+
+        handlers._remove_ups_instance(second_ups)
+
+        self.assertEqual(len(handlers._ups_instances), 2)
+        matches = list(handlers._search_ups(create_query(machine_name="TDS3")))
+        self.assertEqual(len(matches), 1)
+        self.assertEqual(matches[0].SOPInstanceUID, third_ups.SOPInstanceUID)
+        self.assertEqual(handlers._number_of_matching_ups(create_query(machine_name="TDS2")), 0)
+
+    def test_subscription_action_dispatch(self):
+        logger = logging.getLogger("test_upsscp_handlers")
+        handler = handlers._SUBSCRIPTION_ACTION_HANDLERS.get(
+            handlers.UPSGlobalSubscriptionInstance, handlers._handle_ups_instance_subscription_action
+        )
+        self.assertIs(handler, handlers._handle_global_subscription_action)
+        self.assertEqual(handler(3, "SOME_AE", False, None, handlers.UPSGlobalSubscriptionInstance, logger), 0x0000)
+        self.assertIn("SOME_AE", handlers._global_subscribers)
+        self.assertEqual(handler(4, "SOME_AE", False, None, handlers.UPSGlobalSubscriptionInstance, logger), 0x0000)
+        self.assertNotIn("SOME_AE", handlers._global_subscribers)
+        # Suspend Global Subscription is not supported
+        self.assertEqual(handler(5, "SOME_AE", False, None, handlers.UPSGlobalSubscriptionInstance, logger), 0x0211)
+        # an unrecognized UID falls back to the single instance handler,
+        # which is not yet supported
+        fallback = handlers._SUBSCRIPTION_ACTION_HANDLERS.get(
+            uid.generate_uid(), handlers._handle_ups_instance_subscription_action
+        )
+        self.assertIs(fallback, handlers._handle_ups_instance_subscription_action)
+        self.assertEqual(fallback(3, "SOME_AE", False, None, uid.generate_uid(), logger), 0x0211)
+
+    def test_reload_ups_instances(self):
+        logger = logging.getLogger("test_upsscp_handlers")
+        with tempfile.TemporaryDirectory() as instance_dir:
+            for ups in (create_ups(machine_name="TDS1"), create_ups(machine_name="TDS2")):
+                ups.is_little_endian = True
+                ups.is_implicit_VR = True
+                dcmwrite(Path(instance_dir).joinpath(f"UPS_{ups.SOPInstanceUID}.dcm"), ups)
+
+            handlers._reload_ups_instances(instance_dir, logger)
+            self.assertEqual(len(handlers._ups_instances), 2)
+
+            # a second reload must not re-read (or duplicate) unchanged files
+            handlers._reload_ups_instances(instance_dir, logger)
+            self.assertEqual(len(handlers._ups_instances), 2)
+
+    def test_reload_ups_instances_refreshes_updated_file(self):
+        logger = logging.getLogger("test_upsscp_handlers")
+        with tempfile.TemporaryDirectory() as instance_dir:
+            ups = create_ups(machine_name="TDS1", step_state="SCHEDULED")
+            ups.is_little_endian = True
+            ups.is_implicit_VR = True
+            filename = Path(instance_dir).joinpath(f"UPS_{ups.SOPInstanceUID}.dcm")
+            dcmwrite(filename, ups)
+            handlers._reload_ups_instances(instance_dir, logger)
+            self.assertEqual(handlers._number_of_matching_ups(create_query(step_state="SCHEDULED")), 1)
+
+            # rewriting the file with changed content must refresh the
+            # stored dataset and its match keys, not be silently discarded
+            ups.ProcedureStepState = "COMPLETED"
+            dcmwrite(filename, ups)
+            handlers._reload_ups_instances(instance_dir, logger)
+            self.assertEqual(len(handlers._ups_instances), 1)
+            self.assertEqual(handlers._number_of_matching_ups(create_query(step_state="SCHEDULED")), 0)
+            matches = list(handlers._search_ups(create_query(step_state="COMPLETED")))
+            self.assertEqual(len(matches), 1)
+            self.assertEqual(matches[0].ProcedureStepState, "COMPLETED")
+
+    def test_get_machine_name_from_ups(self):
+        self.assertEqual(handlers.get_machine_name_from_ups(create_ups(machine_name="TDS1")), "TDS1")
+        # no sequence and an empty sequence must both yield None, not raise
+        self.assertIsNone(handlers.get_machine_name_from_ups(Dataset()))
+        empty_sequence_ups = Dataset()
+        empty_sequence_ups.ScheduledStationNameCodeSequence = []
+        self.assertIsNone(handlers.get_machine_name_from_ups(empty_sequence_ups))
+
+    def test_get_procedure_step_state_from_ups(self):
+        self.assertEqual(handlers.get_procedure_step_state_from_ups(create_ups(step_state="SCHEDULED")), "SCHEDULED")
+        self.assertIsNone(handlers.get_procedure_step_state_from_ups(Dataset()))
+
+    def test_compile_query(self):
+        compiled = handlers._compile_query(create_query(machine_name="TDS1", step_state="SCHEDULED"))
+        self.assertEqual(compiled.machine_name, "TDS1")
+        self.assertEqual(compiled.step_state, "SCHEDULED")
+        self.assertFalse(compiled.is_empty())
+        self.assertTrue(handlers._compile_query(create_query()).is_empty())
+
+    def test_ups_is_match_for_compiled_query(self):
+        ups = create_ups(machine_name="TDS1", step_state="SCHEDULED")
+        handlers._add_ups_instance(ups)
+        matching_query = handlers._compile_query(create_query(machine_name="TDS1"))
+        self.assertTrue(handlers._ups_is_match_for_query(matching_query, ups))
+        mismatching_query = handlers._compile_query(create_query(step_state="COMPLETED"))
+        self.assertFalse(handlers._ups_is_match_for_query(mismatching_query, ups))
+
+    def test_number_of_matching_ups(self):
+        handlers._add_ups_instance(create_ups(machine_name="TDS1"))
+        handlers._add_ups_instance(create_ups(machine_name="TDS1", step_state="COMPLETED"))
+        handlers._add_ups_instance(create_ups(machine_name="TDS2"))
+
+        self.assertEqual(handlers._number_of_matching_ups(create_query()), 3)
+        self.assertEqual(handlers._number_of_matching_ups(create_query(machine_name="TDS1")), 2)
+        self.assertEqual(
+            handlers._number_of_matching_ups(create_query(machine_name="TDS1", step_state="SCHEDULED")),
+            1,
+        )
+        self.assertEqual(handlers._number_of_matching_ups(create_query(machine_name="TDS3")), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from io import BytesIO
+
+from pydicom import dcmread, dcmwrite
+from pydicom.dataset import Dataset
+
+from tdwii_plus_examples.domain_model.pertinent_resources_sequence_item import PertinentResourcesSequenceItem
+
+
+class TestDicomAttrAccess(unittest.TestCase):
+    def test_get_on_empty_wrapper_returns_none(self):
+        item = PertinentResourcesSequenceItem()
+        self.assertIsNone(item.ResourceDescription)
+        # reading must not materialize the backing dataset
+        self.assertIsNone(item.dataset)
+
+    def test_set_then_get_round_trips(self):
+        item = PertinentResourcesSequenceItem()
+        item.ResourceDescription = "Plan report"
+        self.assertEqual(item.ResourceDescription, "Plan report")
+        self.assertEqual(item.to_dataset().ResourceDescription, "Plan report")
+
+    def test_set_none_removes_the_element(self):
+        item = PertinentResourcesSequenceItem()
+        item.ResourceDescription = "Plan report"
+        item.ResourceDescription = None
+        self.assertIsNone(item.ResourceDescription)
+        self.assertNotIn("ResourceDescription", item.to_dataset())
+
+    def test_set_none_on_absent_element_is_a_no_op(self):
+        item = PertinentResourcesSequenceItem()
+        item.ResourceDescription = None
+        self.assertIsNone(item.ResourceDescription)
+        self.assertIsNone(item.dataset)
+
+    def test_wrapping_an_existing_dataset(self):
+        ds = Dataset()
+        ds.ResourceDescription = "Plan report"
+        ds.RetrieveURI = "http://example.com/plan"
+        item = PertinentResourcesSequenceItem(ds)
+        self.assertEqual(item.ResourceDescription, "Plan report")
+        self.assertEqual(item.RetrieveURI, "http://example.com/plan")
+        # writes go to the wrapped dataset, not a copy
+        item.ResourceDescription = "Updated report"
+        self.assertEqual(ds.ResourceDescription, "Updated report")
+
+    def test_wrapping_a_parsed_dataset_converts_raw_elements(self):
+        ds = Dataset()
+        ds.ResourceDescription = "Plan report"
+        ds.is_little_endian = True
+        ds.is_implicit_VR = True
+        buffer = BytesIO()
+        dcmwrite(buffer, ds)
+        buffer.seek(0)
+        reread = dcmread(buffer, force=True)
+        item = PertinentResourcesSequenceItem(reread)
+        self.assertEqual(item.ResourceDescription, "Plan report")
+
+
+class TestFromMapping(unittest.TestCase):
+    def test_from_mapping_round_trips(self):
+        item = PertinentResourcesSequenceItem.from_mapping(
+            {"ResourceDescription": "Plan report", "RetrieveURI": "http://example.com/plan"}
+        )
+        self.assertEqual(item.ResourceDescription, "Plan report")
+        self.assertEqual(item.RetrieveURI, "http://example.com/plan")
+
+    def test_from_mapping_skips_none_values(self):
+        item = PertinentResourcesSequenceItem.from_mapping({"ResourceDescription": "Plan report", "RetrieveURI": None})
+        self.assertEqual(item.ResourceDescription, "Plan report")
+        self.assertNotIn("RetrieveURI", item.to_dataset())
+
+    def test_from_mapping_rejects_unknown_keywords(self):
+        with self.assertRaises(KeyError):
+            PertinentResourcesSequenceItem.from_mapping({"PatientName": "Test^Patient"})
+
+
+if __name__ == "__main__":
+    unittest.main()